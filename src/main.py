@@ -15,7 +15,6 @@ Usage:
 
 import argparse
 import logging
-import sys
 
 from stage_1_data_acquisition.data_acquisition import main as stage_1
 from stage_2_data_processing.data_processing import main as stage_2
@@ -57,7 +56,7 @@ def main():
     log.info("")
     log.info("Running Stage 2: Data Processing")
     log.info("-" * 40)
-    stage_2()
+    events = stage_2()
 
     if args.skip_upload:
         log.info("")
@@ -66,11 +65,10 @@ def main():
         log.info("")
         log.info("Running Stage 3: Database Upload")
         log.info("-" * 40)
-        if args.dry_run:
-            sys.argv = [sys.argv[0], "--dry-run"]
-        else:
-            sys.argv = [sys.argv[0]]
-        stage_3()
+        # Hand Stage 2's events over directly instead of re-reading its CSV.
+        # With no events Stage 2 writes no CSV, so let Stage 3 fall back to
+        # the file as it did before rather than emptying the table.
+        stage_3(dry_run=args.dry_run, events=events or None)
 
     log.info("")
     log.info("=" * 60)
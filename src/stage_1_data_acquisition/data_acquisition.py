@@ -9,17 +9,24 @@ transformations, serving as the input for Stage 2 processing.
 
 import calendar
 import csv
+import heapq
 import logging
 import os
+import re
+import threading
 import time
-from collections import defaultdict
-from datetime import datetime, date
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, date, timedelta, timezone
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from urllib.parse import quote
 
 from dotenv import load_dotenv
-from dateutil.parser import parse as dateutil_parse
 import yaml
+from urllib3.util.retry import Retry
 
 import fds.sdk.EventsandTranscripts
 from fds.sdk.EventsandTranscripts.api import calendar_events_api
@@ -30,6 +37,11 @@ from fds.sdk.EventsandTranscripts.models import (
     CompanyEventRequestDataUniverse,
 )
 
+try:
+    from yaml import CSafeLoader as YamlLoader  # libyaml-backed, much faster
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 try:
     import rbc_security
 
@@ -40,12 +52,18 @@ except ImportError:
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 OUTPUT_PATH = Path(__file__).parent / "output" / "raw_calendar_events.csv"
-load_dotenv(PROJECT_ROOT / ".env")
 
 # Date range configuration
 PAST_MONTHS = 6
 FUTURE_MONTHS = 6
-DELAY_BETWEEN_CHUNKS = 1  # Seconds to wait between API calls
+DELAY_BETWEEN_CHUNKS = 1  # Minimum seconds between API call starts (shared across workers)
+MAX_WORKERS = 4  # Concurrent API requests in flight
+ONE_DAY = timedelta(days=1)
+
+# API error messages matching this pattern are retried by query_chunk. Connection
+# errors, timeouts and 429/5xx responses are already retried by the urllib3 pool
+# (see create_api_client), so they are not retried again here.
+RETRYABLE_ERROR_PATTERN = re.compile(r"parameter|temporary", re.IGNORECASE)
 
 # =============================================================================
 # CANADIAN BANK US TICKER VARIANTS
@@ -66,12 +84,34 @@ CANADIAN_BANK_US_VARIANTS = [
 # =============================================================================
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
-)
 log = logging.getLogger(__name__)
 
 
+class RateLimiter:
+    """
+    Space out API calls across worker threads.
+
+    Each call to wait() reserves the next free slot, so concurrent workers start
+    requests at most once every `min_interval` seconds. This replaces the fixed
+    sleep between sequential chunks while keeping within FactSet rate limits.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until this caller's slot is reached."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+@lru_cache(maxsize=None)
 def get_query_tickers(tickers):
     """
     Add the 7 Canadian bank US variants to the query list.
@@ -79,17 +119,23 @@ def get_query_tickers(tickers):
     We query both -CA (from YAML) and -US (hardcoded) because FactSet
     sometimes stores events under US tickers for Canadian banks.
     Stage 2 will normalize -US back to -CA during processing.
+
+    Takes and returns a tuple so the result can be cached and shared safely.
+    Duplicates are dropped in O(n) (dict preserves first-seen order) so a variant
+    already present in the YAML is not queried twice.
     """
-    query_tickers = list(tickers) + CANADIAN_BANK_US_VARIANTS
-    log.info("Query expansion: Added %d Canadian bank US variants: %s",
-             len(CANADIAN_BANK_US_VARIANTS), ", ".join(CANADIAN_BANK_US_VARIANTS))
+    query_tickers = tuple(dict.fromkeys((*tickers, *CANADIAN_BANK_US_VARIANTS)))
+    if log.isEnabledFor(logging.INFO):
+        log.info("Query expansion: Added %d Canadian bank US variants: %s",
+                 len(CANADIAN_BANK_US_VARIANTS), ", ".join(CANADIAN_BANK_US_VARIANTS))
     return query_tickers
 
 
+@lru_cache(maxsize=1)
 def load_institutions():
-    """Load monitored institutions from YAML config."""
+    """Load monitored institutions from YAML config (parsed once per process)."""
     with open(PROJECT_ROOT / "monitored_institutions.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 
 def build_proxy_url():
@@ -125,6 +171,18 @@ def create_api_client():
             password=os.getenv("FACTSET_PASSWORD"),
         )
 
+    # Transport-level retries inside the shared urllib3 pool: connection errors
+    # and 429/5xx responses are retried with backoff, honoring Retry-After.
+    # query_chunk only retries the remaining errors (RETRYABLE_ERROR_PATTERN).
+    config.retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
     config.get_basic_auth_token()
     return config
 
@@ -154,52 +212,74 @@ def split_date_range(start_date, end_date):
     current = start_date
 
     while current <= end_date:
-        # Get last day of current month
-        last_day = calendar.monthrange(current.year, current.month)[1]
-        month_end = date(current.year, current.month, last_day)
+        # Last day of current month, capped at the end date
+        month_end = current.replace(day=calendar.monthrange(current.year, current.month)[1])
+        ranges.append((current, min(month_end, end_date)))
+        # The day after month end is the first of the next month (handles year rollover)
+        current = month_end + ONE_DAY
 
-        # Don't go past the end date
-        chunk_end = min(month_end, end_date)
-        ranges.append((current, chunk_end))
+    return ranges
 
-        # Move to first day of next month
-        if current.month == 12:
-            current = date(current.year + 1, 1, 1)
-        else:
-            current = date(current.year, current.month + 1, 1)
 
-    return ranges
+def get_retry_after(err):
+    """Return the Retry-After delay in seconds from an API exception, if present."""
+    headers = getattr(err, "headers", None) or {}
+    try:
+        return max(0, int(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
 
 
-def query_chunk(api, tickers, start, end, max_retries=5):
-    """Query API for a single date range chunk with retry logic."""
-    request = CompanyEventRequest(
-        data=CompanyEventRequestData(
-            date_time=CompanyEventRequestDataDateTime(
-                start=dateutil_parse(f"{start}T00:00:00Z"),
-                end=dateutil_parse(f"{end}T23:59:59Z"),
-            ),
-            universe=CompanyEventRequestDataUniverse(symbols=tickers, type="Tickers"),
-        ),
+def event_to_dict(event):
+    """
+    Project an SDK event model onto a flat dict keyed by its API attribute names.
+
+    Cheaper than the model's to_dict(), which walks openapi_types and rebuilds
+    nested structures for every event. Unset attributes come back as None.
+    """
+    return {name: getattr(event, name, None) for name in event.attribute_map}
+
+
+def build_universe(tickers):
+    """Build the request universe model for a group of tickers."""
+    return CompanyEventRequestDataUniverse(symbols=list(tickers), type="Tickers")
+
+
+def build_date_time(start, end):
+    """Build the request date range model covering whole days from start to end (UTC)."""
+    return CompanyEventRequestDataDateTime(
+        start=datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+        end=datetime(end.year, end.month, end.day, 23, 59, 59, tzinfo=timezone.utc),
     )
 
+
+def query_chunk(api, request, ticker_set, max_retries=5, rate_limiter=None):
+    """
+    Query API for a single prebuilt chunk request with retry logic.
+
+    Only events whose ticker is in `ticker_set` are kept. The same request
+    object is reused across retries.
+    """
     for attempt in range(max_retries):
+        if rate_limiter:
+            rate_limiter.wait()
         try:
             response = api.get_company_event(request)
             if response and hasattr(response, "data") and response.data:
-                return [e.to_dict() for e in response.data if e.ticker in tickers]
+                return [event_to_dict(e) for e in response.data if e.ticker in ticker_set]
             return []
         except Exception as err:
             error_msg = str(err)
             is_last_attempt = attempt == max_retries - 1
 
             # Check if it's a retryable error
-            is_retryable = any(x in error_msg.lower() for x in [
-                "parameter", "timeout", "connection", "temporary", "503", "429"
-            ])
+            is_retryable = RETRYABLE_ERROR_PATTERN.search(error_msg) is not None
 
             if is_retryable and not is_last_attempt:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
+                # Honor server-provided Retry-After, else exponential backoff: 1s, 2s, 4s
+                wait_time = get_retry_after(err)
+                if wait_time is None:
+                    wait_time = 2 ** attempt
                 log.warning(
                     "API error (attempt %d/%d), retrying in %ds: %s",
                     attempt + 1, max_retries, wait_time, error_msg[:100]
@@ -213,54 +293,116 @@ def query_chunk(api, tickers, start, end, max_retries=5):
 
 
 def fetch_events(api, tickers, start_date, end_date):
-    """Fetch all events across date range chunks."""
+    """
+    Fetch events across date range chunks, yielding one list per monthly chunk.
+
+    Yielding per chunk lets the caller write each chunk to disk as it arrives
+    instead of holding every event in memory.
+    """
     # Expand tickers to include US variants for Canadian banks
-    query_tickers = get_query_tickers(tickers)
+    query_tickers = get_query_tickers(tuple(tickers))
 
     chunks = split_date_range(start_date, end_date)
     log.info("Querying %d tickers across %d monthly chunks from %s to %s",
              len(query_tickers), len(chunks), start_date, end_date)
 
-    events = []
-    for i, (start, end) in enumerate(chunks, 1):
-        log.info("  Chunk %d/%d: %s to %s", i, len(chunks), start, end)
-        events.extend(query_chunk(api, query_tickers, start, end))
-        # Delay between chunks to avoid rate limiting
-        if i < len(chunks) and DELAY_BETWEEN_CHUNKS > 0:
-            time.sleep(DELAY_BETWEEN_CHUNKS)
-
-    # Raw events returned as-is. Ticker normalization (-US -> -CA) happens in Stage 2.
-    return events
-
+    # One request per monthly chunk covering every ticker. Months are independent
+    # round-trips, so run them concurrently; the rate limiter spaces out request
+    # starts to avoid FactSet rate limiting.
+    rate_limiter = RateLimiter(DELAY_BETWEEN_CHUNKS)
+    # Build the universe and ticker lookup set once; requests only differ by month
+    universe = build_universe(query_tickers)
+    ticker_set = frozenset(query_tickers)
+    requests = [
+        CompanyEventRequest(
+            data=CompanyEventRequestData(date_time=build_date_time(start, end), universe=universe)
+        )
+        for start, end in chunks
+    ]
+    executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(requests))))
+    pending = deque()
+    queued = iter(requests)
+
+    def submit_next():
+        request = next(queued, None)
+        if request is not None:
+            pending.append(
+                executor.submit(query_chunk, api, request, ticker_set, rate_limiter=rate_limiter)
+            )
+
+    try:
+        # Keep at most MAX_WORKERS requests in flight. Futures are popped as their
+        # results are taken, so only chunks not yet yielded stay in memory.
+        for _ in range(MAX_WORKERS):
+            submit_next()
+        # Yield in submission order so output is deterministic
+        for i, (start, end) in enumerate(chunks, 1):
+            chunk_events = pending.popleft().result()
+            submit_next()
+            log.info("  Chunk %d/%d: %s to %s (%d events)",
+                     i, len(chunks), start, end, len(chunk_events))
+            # Raw events as-is. Ticker normalization (-US -> -CA) happens in Stage 2.
+            yield chunk_events
+    finally:
+        # If the consumer stops early (e.g. the CSV write failed), drop queued
+        # requests instead of running them all at the rate-limited pace
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def save_events(event_chunks, output_path):
+    """
+    Stream event chunks to CSV preserving all fields - NO transformations.
 
-def save_events(events, output_path):
-    """Save events to CSV preserving all fields - NO transformations."""
-    if not events:
+    Writes to a temporary file and moves it into place once complete, so a failed
+    run never leaves a partial CSV behind. Returns event type counts.
+    """
+    counts = Counter()
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    f = writer = fields = None
+
+    try:
+        for events in event_chunks:
+            if not events:
+                continue
+            if writer is None:
+                # Save raw data as-is. Every event is projected from the same model
+                # attribute_map, so the first event's keys are the full schema.
+                fields = sorted(events[0])
+                row_getter = itemgetter(*fields)
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                # 1 MiB buffer: far fewer write syscalls than the 8 KiB default
+                f = open(tmp_path, "w", newline="", encoding="utf-8", buffering=1 << 20)
+                writer = csv.writer(f)
+                writer.writerow(fields)
+            writer.writerows(map(row_getter, events))
+            counts.update(event.get("event_type") or "Unknown" for event in events)
+    except BaseException:
+        # Remove the partial temporary file before propagating the error
+        if f is not None:
+            f.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    if f is not None:
+        f.close()
+
+    if writer is None:
         log.warning("No events to save")
-        return False
+        return counts
 
-    # Save raw data as-is. Ticker normalization (-US -> -CA) happens in Stage 2.
-    fields = sorted({key for event in events for key in event.keys()})
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, output_path)
+    return counts
 
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(events)
-    return True
 
-
-def log_event_types(events):
-    """Log summary of event types retrieved."""
-    counts = defaultdict(int)
-    for event in events:
-        counts[event.get("event_type", "Unknown")] += 1
-    log.info("Event types: %s", dict(sorted(counts.items(), key=lambda x: -x[1])))
+def log_event_types(counts, limit=25):
+    """Log the most common event types retrieved (heap-selected, no full sort)."""
+    log.info("Event types: %s", dict(heapq.nlargest(limit, counts.items(), key=itemgetter(1))))
 
 
 def main():
     """Execute Stage 1 data acquisition pipeline."""
     log.info("STAGE 1: DATA ACQUISITION")
+    load_dotenv(PROJECT_ROOT / ".env")
 
     institutions = load_institutions()
     tickers = list(institutions.keys())
@@ -275,13 +417,20 @@ def main():
 
     with fds.sdk.EventsandTranscripts.ApiClient(api_config) as client:
         api = calendar_events_api.CalendarEventsApi(client)
-        events = fetch_events(api, tickers, start_date, end_date)
+        # closing() stops the fetch (cancelling queued requests) as soon as saving fails
+        with closing(fetch_events(api, tickers, start_date, end_date)) as event_chunks:
+            counts = save_events(event_chunks, OUTPUT_PATH)
 
-    log.info("Retrieved %d events", len(events))
-    save_events(events, OUTPUT_PATH)
-    log.info("Saved to %s", OUTPUT_PATH)
-    log_event_types(events)
+    log.info("Retrieved %d events", sum(counts.values()))
+    if counts:
+        log.info("Saved to %s", OUTPUT_PATH)
+    log_event_types(counts)
 
 
 if __name__ == "__main__":
+    # Configure logging only when run as a script; src/main.py configures it
+    # once for the combined pipeline.
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
+    )
     main()
@@ -11,13 +11,20 @@ switching data sources from API to Snowflake.
 
 import csv
 import logging
-from collections import defaultdict
-from datetime import datetime
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
+from zoneinfo import ZoneInfo
 
 import yaml
-import pytz
-from dateutil.parser import parse as dateutil_parse
+
+try:
+    from yaml import CSafeLoader as YamlLoader  # libyaml-backed, much faster
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 # Paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -29,11 +36,15 @@ OUTPUT_PATH = Path(__file__).parent / "output" / "processed_calendar_events.csv"
 
 # Timezone for local time conversion
 LOCAL_TIMEZONE = "America/Toronto"
+LOCAL_TZ = ZoneInfo(LOCAL_TIMEZONE)
+# Expected abbreviations for LOCAL_TIMEZONE, keyed by UTC offset
+TZ_ABBREVIATIONS = {timedelta(hours=-5): "EST", timedelta(hours=-4): "EDT"}
 
 # Canadian bank tickers that should always be -CA, never -US
 # (FactSet sometimes returns these with -US suffix)
 # Note: LB is excluded - LB-US is a different company, not Laurentian Bank
 CANADIAN_BANK_BASES = ["RY", "TD", "BMO", "BNS", "CM", "NA"]
+CANADIAN_BANK_REMAP = {f"{base}-US": f"{base}-CA" for base in CANADIAN_BANK_BASES}
 
 # Event types to include in final output
 INCLUDED_EVENT_TYPES = [
@@ -82,6 +93,13 @@ FIELD_MAPPING = {
     "last_modified_date": "last_modified_date",
 }
 
+# Contact info parts: (label, field), in display order
+CONTACT_FIELDS = [
+    ("Contact", "contact_name"),
+    ("Phone", "contact_phone"),
+    ("Email", "contact_email"),
+]
+
 # Output CSV columns matching PostgreSQL schema
 OUTPUT_SCHEMA = [
     "event_id",
@@ -102,28 +120,43 @@ OUTPUT_SCHEMA = [
     "data_fetched_timestamp",
 ]
 
+# Institution fields used for tickers missing from monitored_institutions.yaml
+UNKNOWN_INSTITUTION = ("Unknown", "", "Unknown")
+
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
-)
 log = logging.getLogger(__name__)
 
 
 def load_raw_events(path):
-    """Load raw CSV events from Stage 1."""
-    with open(path, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    """Yield raw CSV events from Stage 1 one row at a time.
+
+    Source columns are renamed to internal field names via FIELD_MAPPING once,
+    on the header, so rows can be read by internal name directly.
+    """
+    source_to_field = {source: field for field, source in FIELD_MAPPING.items()}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f, restval="")
+        if reader.fieldnames:
+            reader.fieldnames = [source_to_field.get(c, c) for c in reader.fieldnames]
+        yield from reader
 
 
 def load_institutions():
     """Load institution metadata from YAML config."""
     with open(PROJECT_ROOT / "monitored_institutions.yaml", "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 
-def get_field(event, field, default=""):
-    """Get mapped field value from raw event."""
-    return event.get(FIELD_MAPPING.get(field, field), default) or default
+def build_institution_lookup(institutions):
+    """Map ticker -> (name, id, type) so each event needs a single lookup."""
+    return {
+        sys.intern(ticker): (
+            inst.get("name", "Unknown"),
+            inst.get("id", ""),
+            inst.get("type", "Unknown"),
+        )
+        for ticker, inst in institutions.items()
+    }
 
 
 def normalize_canadian_ticker(ticker):
@@ -134,16 +167,32 @@ def normalize_canadian_ticker(ticker):
     This ensures institution lookup works correctly.
     """
     ticker = (ticker or "").strip()
-    for base in CANADIAN_BANK_BASES:
-        if ticker == f"{base}-US":
-            return f"{base}-CA"
-    return ticker
+    return CANADIAN_BANK_REMAP.get(ticker, ticker)
+
+
+def parse_iso_datetime(value):
+    """Parse an ISO-8601 datetime string, accepting a trailing 'Z' for UTC."""
+    value = str(value).strip()
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value)
+
 
+def _tz_abbreviation(dt_local):
+    """Return EST/EDT from the UTC offset, falling back to tzname() with a warning."""
+    tz_abbr = TZ_ABBREVIATIONS.get(dt_local.utcoffset())
+    if tz_abbr is None:
+        tz_abbr = dt_local.tzname()
+        log.warning("Unexpected timezone: %s", tz_abbr)
+    return tz_abbr
 
+
+@lru_cache(maxsize=4096)
 def convert_timezone(utc_str, time_unconfirmed=False):
     """Convert UTC datetime string to local time.
 
-    Returns (utc_iso, local_iso, date, time).
+    Returns (utc_iso, local_iso, date, time). Results are cached since many
+    events share the same timestamp (e.g. unconfirmed midnight dates).
 
     Args:
         utc_str: UTC datetime string to convert
@@ -155,36 +204,28 @@ def convert_timezone(utc_str, time_unconfirmed=False):
     if not utc_str:
         return ("", "", "", "")
     try:
-        dt = dateutil_parse(str(utc_str))
+        dt = parse_iso_datetime(utc_str)
         if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=pytz.UTC)
+            dt = dt.replace(tzinfo=timezone.utc)
+
+        # Format each datetime once and slice date/time out of the ISO string
+        utc_iso = dt.isoformat()
 
         # Handle unconfirmed times: keep the date intact instead of shifting
         if time_unconfirmed:
-            date_str = dt.strftime("%Y-%m-%d")
-            local_tz = pytz.timezone(LOCAL_TIMEZONE)
             # Create midnight in local timezone for that same date
-            dt_local = local_tz.localize(
-                datetime(dt.year, dt.month, dt.day, 0, 0, 0)
-            )
-            tz_abbr = dt_local.strftime("%Z")
+            dt_local = datetime(dt.year, dt.month, dt.day, tzinfo=LOCAL_TZ)
             return (
-                dt.isoformat(),
+                utc_iso,
                 dt_local.isoformat(),
-                date_str,
-                f"00:00 {tz_abbr}",
+                utc_iso[:10],
+                f"00:00 {_tz_abbreviation(dt_local)}",
             )
 
-        dt_local = dt.astimezone(pytz.timezone(LOCAL_TIMEZONE))
-        tz_abbr = dt_local.strftime("%Z")
-        if tz_abbr not in ("EST", "EDT"):
-            log.warning("Unexpected timezone: %s", tz_abbr)
-        return (
-            dt.isoformat(),
-            dt_local.isoformat(),
-            dt_local.strftime("%Y-%m-%d"),
-            dt_local.strftime(f"%H:%M {tz_abbr}"),
-        )
+        dt_local = dt.astimezone(LOCAL_TZ)
+        local_iso = dt_local.isoformat()
+        tz_abbr = _tz_abbreviation(dt_local)
+        return (utc_iso, local_iso, local_iso[:10], f"{local_iso[11:16]} {tz_abbr}")
     except (ValueError, TypeError, AttributeError) as e:
         log.warning("Failed to parse datetime '%s': %s", utc_str, e)
         return ("", "", "", "")
@@ -192,14 +233,11 @@ def convert_timezone(utc_str, time_unconfirmed=False):
 
 def build_contact_info(event):
     """Combine contact fields into single string."""
-    parts = []
-    if name := get_field(event, "contact_name"):
-        parts.append(f"Contact: {name}")
-    if phone := get_field(event, "contact_phone"):
-        parts.append(f"Phone: {phone}")
-    if email := get_field(event, "contact_email"):
-        parts.append(f"Email: {email}")
-    return " | ".join(parts)
+    return " | ".join(
+        f"{label}: {value}"
+        for label, field in CONTACT_FIELDS
+        if (value := event.get(field))
+    )
 
 
 def normalize_fiscal_year(value):
@@ -210,23 +248,27 @@ def normalize_fiscal_year(value):
 
 
 def transform_event(raw, institutions, timestamp):
-    """Transform raw event to output schema format."""
+    """Transform raw event to output schema format.
+
+    institutions is the ticker lookup from build_institution_lookup().
+    """
     # Normalize Canadian bank tickers (-US -> -CA) for correct institution lookup
-    raw_ticker = get_field(raw, "ticker")
-    ticker = normalize_canadian_ticker(raw_ticker)
+    raw_ticker = raw.get("ticker", "")
+    # Intern low-cardinality keys so grouping/dedup compare shared strings
+    ticker = sys.intern(normalize_canadian_ticker(raw_ticker))
 
     # Also normalize description if it contains -US ticker
-    description = get_field(raw, "description")
+    description = raw.get("description", "")
     if raw_ticker != ticker and raw_ticker in description:
         description = description.replace(raw_ticker, ticker)
 
-    inst = institutions.get(ticker, {})
+    inst_name, inst_id, inst_type = institutions.get(ticker, UNKNOWN_INSTITUTION)
 
     # Check if time is unconfirmed (FactSet sets market_time_code to "Unspecified")
-    time_unconfirmed = get_field(raw, "market_time_code") == "Unspecified"
+    time_unconfirmed = raw.get("market_time_code", "") == "Unspecified"
 
     utc, local, date, time = convert_timezone(
-        get_field(raw, "event_datetime_utc"),
+        raw.get("event_datetime_utc", ""),
         time_unconfirmed=time_unconfirmed,
     )
 
@@ -236,24 +278,24 @@ def transform_event(raw, institutions, timestamp):
         headline = f"{description} (Time TBD)"
 
     return {
-        "event_id": get_field(raw, "event_id"),
+        "event_id": raw.get("event_id", ""),
         "ticker": ticker,
-        "institution_name": inst.get("name", "Unknown"),
-        "institution_id": inst.get("id", ""),
-        "institution_type": inst.get("type", "Unknown"),
-        "event_type": get_field(raw, "event_type"),
+        "institution_name": inst_name,
+        "institution_id": inst_id,
+        "institution_type": inst_type,
+        "event_type": sys.intern(raw.get("event_type", "")),
         "event_headline": headline,
         "event_date_time_utc": utc,
         "event_date_time_local": local,
         "event_date": date,
         "event_time_local": time,
-        "webcast_link": get_field(raw, "webcast_link"),
+        "webcast_link": raw.get("webcast_link", ""),
         "contact_info": build_contact_info(raw),
-        "fiscal_year": normalize_fiscal_year(get_field(raw, "fiscal_year")),
-        "fiscal_period": get_field(raw, "fiscal_period"),
+        "fiscal_year": sys.intern(normalize_fiscal_year(raw.get("fiscal_year", ""))),
+        "fiscal_period": sys.intern(raw.get("fiscal_period", "")),
         "data_fetched_timestamp": timestamp,
         # Keep last_modified_date for earnings dedup (not in OUTPUT_SCHEMA)
-        "_last_modified_date": get_field(raw, "last_modified_date"),
+        "_last_modified_date": raw.get("last_modified_date", ""),
     }
 
 
@@ -268,18 +310,22 @@ def get_allowed_types():
     return allowed
 
 
+# Built once from the config above; filter_events checks every event against these
+ALLOWED_TYPES = frozenset(get_allowed_types())
+EXCLUDED_TYPES = frozenset(EXCLUDED_EVENT_TYPES)
+
+
 def filter_events(events):
     """Filter to approved event types, excluding banned types."""
-    allowed = get_allowed_types()
     filtered = []
-    excluded_counts = defaultdict(int)
-    explicitly_excluded_counts = defaultdict(int)
+    excluded_counts = Counter()
+    explicitly_excluded_counts = Counter()
 
     for event in events:
         etype = event.get("event_type", "")
-        if etype in EXCLUDED_EVENT_TYPES:
+        if etype in EXCLUDED_TYPES:
             explicitly_excluded_counts[etype] += 1
-        elif etype in allowed:
+        elif etype in ALLOWED_TYPES:
             filtered.append(event)
         else:
             excluded_counts[etype] += 1
@@ -305,36 +351,36 @@ def dedupe_same_datetime(events):
     # Build priority lookup (lower number = higher priority)
     priority = {t: i for i, t in enumerate(DATETIME_DEDUP_PRIORITY)}
 
-    # Group events by (ticker, datetime)
-    groups = defaultdict(list)
+    # Keep the best event seen so far per (ticker, datetime) in a single pass
+    best = {}
     other = []
+    merged_count = 0
 
     for event in events:
         etype = event.get("event_type", "")
-        if etype in priority:
-            key = (event.get("ticker", ""), event.get("event_date_time_utc", ""))
-            groups[key].append(event)
-        else:
+        if etype not in priority:
             other.append(event)
-
-    # For each group, keep highest priority event
-    result = []
-    merged_count = 0
-
-    for key, group in groups.items():
-        if len(group) == 1:
-            result.append(group[0])
+            continue
+        key = (event.get("ticker", ""), event.get("event_date_time_utc", ""))
+        rank = priority[etype]
+        current = best.get(key)
+        if current is None:
+            best[key] = (rank, event)
+            continue
+        # Lower index wins; on ties the earlier event is kept
+        merged_count += 1
+        if rank < current[0]:
+            best[key], dropped = (rank, event), current[1]
         else:
-            # Sort by priority (lowest index = highest priority)
-            group.sort(key=lambda e: priority.get(e.get("event_type", ""), 999))
-            result.append(group[0])
-            merged_count += len(group) - 1
-            log.debug(
-                "Same datetime %s %s: kept %s, dropped %s",
-                key[0], key[1][:10] if key[1] else "",
-                group[0].get("event_type"),
-                [e.get("event_type") for e in group[1:]]
-            )
+            dropped = event
+        log.debug(
+            "Same datetime %s %s: kept %s, dropped %s",
+            key[0], key[1][:10] if key[1] else "",
+            best[key][1].get("event_type"),
+            dropped.get("event_type"),
+        )
+
+    result = [event for _, event in best.values()]
 
     if merged_count:
         log.info("Merged %d events with identical ticker+datetime", merged_count)
@@ -349,17 +395,14 @@ def _get_event_month(event):
     return date[:7] if len(date) >= 7 else ""
 
 
-def _pick_by_peer_comparison(group, fiscal_year, fiscal_period, peer_index):
+def _pick_by_peer_comparison(group, peer_months):
     """
     Pick the best event from a duplicate group using peer comparison.
 
     When duplicate earnings events have dates in different months, compare against
     other Canadian banks' earnings for the same fiscal period to find the consensus.
+    peer_months maps YYYY-MM to the number of peer events in that month.
     """
-    # Get months from peer events for this fiscal period
-    peer_key = (fiscal_year, fiscal_period)
-    peer_months = peer_index.get(peer_key, {})
-
     if not peer_months:
         # No peer data - fall back to last_modified
         return None
@@ -384,13 +427,8 @@ def _pick_by_peer_comparison(group, fiscal_year, fiscal_period, peer_index):
 
 
 def _pick_by_last_modified(group):
-    """Pick the most recently modified event from a group."""
-    group_sorted = sorted(
-        group,
-        key=lambda e: e.get("_last_modified_date", "") or "",
-        reverse=True,
-    )
-    return group_sorted[0]
+    """Pick the most recently modified event from a group (first one wins ties)."""
+    return max(group, key=lambda e: e.get("_last_modified_date", "") or "")
 
 
 def dedupe_earnings_by_fiscal_period(events):
@@ -431,15 +469,16 @@ def dedupe_earnings_by_fiscal_period(events):
             # No fiscal period info, can't dedupe - keep as-is
             other.append(event)
 
-    # Build peer index: for each (fiscal_year, fiscal_period), count events per month
-    # across ALL tickers (used for peer comparison when dates conflict)
-    peer_index = defaultdict(lambda: defaultdict(int))
+    # Build peer index once: for each (fiscal_year, fiscal_period), the (ticker, month)
+    # of every dated earnings event across ALL tickers, in input order (used for peer
+    # comparison when dates conflict)
+    peer_index = defaultdict(list)
     for event in earnings:
         fy = event.get("fiscal_year", "")
         fp = event.get("fiscal_period", "")
         month = _get_event_month(event)
         if fy and fp and month:
-            peer_index[(fy, fp)][month] += 1
+            peer_index[(fy, fp)].append((event.get("ticker"), month))
 
     # Process each group
     result = []
@@ -464,17 +503,13 @@ def dedupe_earnings_by_fiscal_period(events):
             method = "last_modified"
         else:
             # Different months - try peer comparison
-            # Build peer index excluding this ticker's events
-            filtered_peer_index = defaultdict(lambda: defaultdict(int))
-            for event in earnings:
-                if event.get("ticker") != ticker:
-                    e_fy = event.get("fiscal_year", "")
-                    e_fp = event.get("fiscal_period", "")
-                    month = _get_event_month(event)
-                    if e_fy and e_fp and month:
-                        filtered_peer_index[(e_fy, e_fp)][month] += 1
-
-            winner = _pick_by_peer_comparison(group, fy, fp, filtered_peer_index)
+            # Count peer months for this fiscal period, excluding this ticker's events
+            peer_months = defaultdict(int)
+            for peer_ticker, month in peer_index.get((fy, fp), ()):
+                if peer_ticker != ticker:
+                    peer_months[month] += 1
+
+            winner = _pick_by_peer_comparison(group, peer_months)
             if winner:
                 method = "peer_comparison"
                 peer_resolved_count += 1
@@ -513,6 +548,10 @@ def build_dedup_lookup():
     return lookup
 
 
+# Built once from DEDUP_RULES; consolidate_events looks up every event in it
+DEDUP_LOOKUP = build_dedup_lookup()
+
+
 def get_dedup_key(event, target):
     """Get grouping key for deduplication."""
     ticker = event.get("ticker", "")
@@ -524,28 +563,30 @@ def get_dedup_key(event, target):
 
 def consolidate_events(events):
     """Apply deduplication and rename rules."""
-    dedup_lookup = build_dedup_lookup()
-    groups, other = defaultdict(list), []
+    best, other = {}, []
 
+    # Keep the highest priority source per key in a single pass (earlier wins ties)
     for event in events:
         etype = event.get("event_type", "")
-        if etype in dedup_lookup:
-            target, _ = dedup_lookup[etype]
-            groups[get_dedup_key(event, target)].append(event)
+        if etype in DEDUP_LOOKUP:
+            target, priority = DEDUP_LOOKUP[etype]
+            key = get_dedup_key(event, target)
+            current = best.get(key)
+            if current is None or priority < current[0]:
+                best[key] = (priority, event)
         else:
             other.append(event)
 
+    # Events are owned by this pipeline (built by transform_event), so winners and
+    # renamed events are updated in place rather than copied
     result = []
-    for key, group in groups.items():
-        group.sort(key=lambda e: dedup_lookup.get(e.get("event_type"), ("", 999))[1])
-        winner = group[0].copy()
+    for key, (_, winner) in best.items():
         winner["event_type"] = key[0]
         result.append(winner)
 
     # Apply rename rules to remaining events
     for event in other:
         if event.get("event_type", "") in RENAME_RULES:
-            event = event.copy()
             event["event_type"] = RENAME_RULES[event["event_type"]]
         result.append(event)
 
@@ -558,40 +599,47 @@ def save_events(events, path):
         log.warning("No events to save")
         return False
     path.parent.mkdir(parents=True, exist_ok=True)
+    # Project straight to OUTPUT_SCHEMA order; internal fields like
+    # _last_modified_date are simply not selected
+    row_getter = itemgetter(*OUTPUT_SCHEMA)
     with open(path, "w", newline="", encoding="utf-8") as f:
-        # extrasaction='ignore' drops internal fields like _last_modified_date
-        writer = csv.DictWriter(f, fieldnames=OUTPUT_SCHEMA, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(events)
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_SCHEMA)
+        writer.writerows(map(row_getter, events))
     return True
 
 
 def log_summary(events):
     """Log event type and institution type counts."""
-    etypes, itypes = defaultdict(int), defaultdict(int)
-    for e in events:
-        etypes[e.get("event_type", "Unknown")] += 1
-        itypes[e.get("institution_type", "Unknown")] += 1
-    log.info("Event types: %s", dict(sorted(etypes.items(), key=lambda x: -x[1])))
-    log.info("Institution types: %s", dict(sorted(itypes.items(), key=lambda x: -x[1])))
+    etypes = Counter(e.get("event_type", "Unknown") for e in events)
+    itypes = Counter(e.get("institution_type", "Unknown") for e in events)
+    log.info("Event types: %s", dict(etypes.most_common()))
+    log.info("Institution types: %s", dict(itypes.most_common()))
 
 
 def main():
-    """Execute Stage 2 data processing pipeline."""
+    """Execute Stage 2 data processing pipeline.
+
+    Returns the processed events (also saved to OUTPUT_PATH) so a combined run
+    can hand them to Stage 3 without re-reading the CSV, or None if the Stage 1
+    output is missing.
+    """
     log.info("STAGE 2: DATA PROCESSING")
 
     if not INPUT_PATH.exists():
         log.error("Input not found: %s - run Stage 1 first", INPUT_PATH)
         return
 
-    raw_events = load_raw_events(INPUT_PATH)
     institutions = load_institutions()
-    log.info(
-        "Loaded %d raw events, %d institutions", len(raw_events), len(institutions)
-    )
+    institution_lookup = build_institution_lookup(institutions)
+    timestamp = datetime.now(timezone.utc).isoformat()
 
-    timestamp = datetime.now(pytz.UTC).isoformat()
-    events = [transform_event(raw, institutions, timestamp) for raw in raw_events]
+    # Transform while reading so the raw rows are never held in memory as a whole
+    events = [
+        transform_event(raw, institution_lookup, timestamp)
+        for raw in load_raw_events(INPUT_PATH)
+    ]
+    log.info("Loaded %d raw events, %d institutions", len(events), len(institutions))
 
     events = filter_events(events)
     log.info("After filtering: %d events", len(events))
@@ -618,11 +666,18 @@ def main():
             before - len(events),
         )
 
-    events.sort(key=lambda x: x.get("event_date_time_utc", ""))
+    # transform_event always sets event_date_time_utc ("" when unparseable)
+    events.sort(key=itemgetter("event_date_time_utc"))
     save_events(events, OUTPUT_PATH)
     log.info("Saved to %s", OUTPUT_PATH)
     log_summary(events)
+    return events
 
 
 if __name__ == "__main__":
+    # Configure logging only when run as a script; src/main.py configures it
+    # once for the combined pipeline.
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
+    )
     main()
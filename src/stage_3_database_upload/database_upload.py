@@ -13,9 +13,10 @@ Usage:
 
 import argparse
 import csv
+import io
 import logging
 import os
-from collections import defaultdict
+from collections import Counter
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -30,17 +31,9 @@ INPUT_PATH = (
 OUTPUT_DIR = Path(__file__).parent / "output"
 OUTPUT_CSV = OUTPUT_DIR / "calendar_events.csv"
 OUTPUT_SQL = OUTPUT_DIR / "calendar_events.sql"
-load_dotenv(PROJECT_ROOT / ".env")
-
-# PostgreSQL configuration from environment
-DB_CONFIG = {
-    "host": os.getenv("POSTGRES_HOST"),
-    "port": os.getenv("POSTGRES_PORT"),
-    "database": os.getenv("POSTGRES_DATABASE"),
-    "user": os.getenv("POSTGRES_USER"),
-    "password": os.getenv("POSTGRES_PASSWORD"),
-    "table": os.getenv("POSTGRES_TABLE"),
-}
+
+# PostgreSQL configuration, populated from the environment by load_db_config()
+DB_CONFIG = {}
 
 # Expected schema columns
 EXPECTED_COLUMNS = [
@@ -63,18 +56,37 @@ EXPECTED_COLUMNS = [
 ]
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
-)
 log = logging.getLogger(__name__)
 
 
+def load_db_config():
+    """Load .env and populate DB_CONFIG from the environment."""
+    load_dotenv(PROJECT_ROOT / ".env")
+    DB_CONFIG.update({
+        "host": os.getenv("POSTGRES_HOST"),
+        "port": os.getenv("POSTGRES_PORT"),
+        "database": os.getenv("POSTGRES_DATABASE"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "table": os.getenv("POSTGRES_TABLE"),
+    })
+
+
 def load_events(path):
     """Load processed CSV events from Stage 2."""
     with open(path, "r", encoding="utf-8") as f:
         return list(csv.DictReader(f))
 
 
+def validate_csv_header(path):
+    """Check the CSV header against expected columns, returns (missing, extra)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        header = set(next(csv.reader(f), []))
+    expected = set(EXPECTED_COLUMNS)
+
+    return list(expected - header), list(header - expected)
+
+
 def get_db_url():
     """Build PostgreSQL connection URL from config."""
     return (
@@ -91,9 +103,9 @@ def connect_db():
     return engine
 
 
-def validate_table_schema(engine):
+def validate_table_schema(conn):
     """Validate table exists and has expected columns, returns (missing, extra)."""
-    inspector = inspect(engine)
+    inspector = inspect(conn)
     table = DB_CONFIG["table"]
 
     if table not in inspector.get_table_names():
@@ -105,30 +117,25 @@ def validate_table_schema(engine):
     return list(expected - db_columns), list(db_columns - expected)
 
 
-def get_row_count(engine):
+def get_row_count(conn):
     """Get current row count in target table."""
     table = DB_CONFIG["table"]
-    with engine.connect() as conn:
-        result = conn.execute(text(f"SELECT COUNT(*) FROM {table}"))
-        return result.scalar()
+    return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
 
 
-def delete_all_rows(engine, dry_run=False):
+def delete_all_rows(conn, dry_run=False):
     """Delete all rows from table one by one, returns count deleted."""
     table = DB_CONFIG["table"]
 
     if dry_run:
-        count = get_row_count(engine)
+        count = get_row_count(conn)
         log.info("[DRY RUN] Would delete %d rows from %s", count, table)
         return count
 
-    with engine.connect() as conn:
-        result = conn.execute(text(f"DELETE FROM {table}"))
-        conn.commit()
-        return result.rowcount
+    return conn.execute(text(f"DELETE FROM {table}")).rowcount
 
 
-def insert_events(engine, events, dry_run=False):
+def insert_events(conn, events, dry_run=False):
     """Insert events into table, returns count inserted."""
     table = DB_CONFIG["table"]
 
@@ -140,26 +147,29 @@ def insert_events(engine, events, dry_run=False):
         return 0
 
     columns = EXPECTED_COLUMNS
-    placeholders = ", ".join([f":{col}" for col in columns])
     col_names = ", ".join(columns)
 
-    # Columns that should be NULL instead of empty string (for integer/numeric types)
+    # Columns that should be NULL instead of empty string (for integer/numeric types).
+    # In CSV COPY an unquoted empty field is NULL, so every other column is listed
+    # in FORCE_NOT_NULL to keep empty strings as "".
     nullable_int_columns = {"institution_id", "fiscal_year"}
+    not_null_cols = ", ".join(col for col in columns if col not in nullable_int_columns)
+    copy_sql = (
+        f"COPY {table} ({col_names}) FROM STDIN "
+        f"WITH (FORMAT csv, FORCE_NOT_NULL ({not_null_cols}))"
+    )
 
-    with engine.connect() as conn:
-        for event in events:
-            row = {}
-            for col in columns:
-                value = event.get(col, "")
-                # Convert empty strings to None for integer columns
-                if col in nullable_int_columns and value == "":
-                    value = None
-                row[col] = value
-            conn.execute(
-                text(f"INSERT INTO {table} ({col_names}) VALUES ({placeholders})"),
-                row,
-            )
-        conn.commit()
+    # Stream all rows in one COPY instead of a round-trip per INSERT
+    buf = io.StringIO()
+    csv.writer(buf).writerows([event.get(col, "") for col in columns] for event in events)
+    buf.seek(0)
+
+    # COPY runs on the caller's DBAPI connection, inside its transaction
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(copy_sql, buf)
+    finally:
+        cursor.close()
 
     return len(events)
 
@@ -168,13 +178,19 @@ def log_summary(events):
     """Log summary statistics about the data."""
     if not events:
         return
-    etypes = defaultdict(int)
+    # Event type counts and date range in a single pass over the events
+    etypes = Counter()
+    first_date = last_date = None
     for e in events:
         etypes[e.get("event_type", "Unknown")] += 1
-    dates = [e.get("event_date", "") for e in events if e.get("event_date")]
-    date_range = f"{min(dates)} to {max(dates)}" if dates else "N/A"
+        if date := e.get("event_date"):
+            if first_date is None or date < first_date:
+                first_date = date
+            if last_date is None or date > last_date:
+                last_date = date
+    date_range = f"{first_date} to {last_date}" if first_date else "N/A"
     log.info("Data summary: %d events, date range: %s", len(events), date_range)
-    log.info("Event types: %s", dict(sorted(etypes.items(), key=lambda x: -x[1])))
+    log.info("Event types: %s", dict(etypes.most_common()))
 
 
 def escape_sql_value(value):
@@ -232,39 +248,45 @@ def export_csv(events, output_path):
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
     with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=EXPECTED_COLUMNS)
-        writer.writeheader()
-        for event in events:
-            row = {col: event.get(col, "") for col in EXPECTED_COLUMNS}
-            writer.writerow(row)
+        writer = csv.writer(f)
+        writer.writerow(EXPECTED_COLUMNS)
+        writer.writerows(
+            [event.get(col, "") for col in EXPECTED_COLUMNS] for event in events
+        )
 
     log.info("Exported CSV: %s", output_path)
     return True
 
 
-def main():
-    """Execute Stage 3 database upload pipeline."""
-    parser = argparse.ArgumentParser(description="Upload calendar events to PostgreSQL")
-    parser.add_argument(
-        "--dry-run",
-        action="store_true",
-        help="Test mode: validate and connect but don't modify database",
-    )
-    args = parser.parse_args()
+def main(dry_run=False, events=None):
+    """Execute Stage 3 database upload pipeline.
 
-    if args.dry_run:
+    events can be passed in from Stage 2 when running the combined pipeline;
+    otherwise they are loaded from the Stage 2 output CSV.
+    """
+    if dry_run:
         log.info("=" * 60)
         log.info("DRY RUN MODE - No database changes will be made")
         log.info("=" * 60)
 
     log.info("STAGE 3: DATABASE UPLOAD")
+    load_db_config()
 
-    if not INPUT_PATH.exists():
+    if events is not None:
+        log.info("Received %d events from Stage 2", len(events))
+    elif not INPUT_PATH.exists():
         log.error("Input not found: %s - run Stage 2 first", INPUT_PATH)
         return
-
-    events = load_events(INPUT_PATH)
-    log.info("Loaded %d events from CSV", len(events))
+    else:
+        # Check the header before parsing any rows
+        missing, extra = validate_csv_header(INPUT_PATH)
+        if missing:
+            log.error("Missing columns in input CSV: %s", missing)
+            return
+        if extra:
+            log.warning("Extra columns in input CSV (ignored): %s", extra)
+        events = load_events(INPUT_PATH)
+        log.info("Loaded %d events from CSV", len(events))
     log_summary(events)
 
     log.info(
@@ -282,35 +304,40 @@ def main():
         log.error("Database connection failed: %s", e)
         return
 
-    log.info("Validating table schema: %s", DB_CONFIG["table"])
-    try:
-        missing, extra = validate_table_schema(engine)
-        if missing:
-            log.error("Missing columns in database: %s", missing)
+    # One connection and one transaction for the whole upload: the DELETE and
+    # COPY commit together, so a failed load leaves the existing rows in place
+    with engine.begin() as conn:
+        log.info("Validating table schema: %s", DB_CONFIG["table"])
+        try:
+            missing, extra = validate_table_schema(conn)
+            if missing:
+                log.error("Missing columns in database: %s", missing)
+                return
+            if extra:
+                log.warning("Extra columns in database (ignored): %s", extra)
+            log.info("Schema validation passed")
+        except ValueError as e:
+            log.error("Schema validation failed: %s", e)
             return
-        if extra:
-            log.warning("Extra columns in database (ignored): %s", extra)
-        log.info("Schema validation passed")
-    except ValueError as e:
-        log.error("Schema validation failed: %s", e)
-        return
 
-    current_count = get_row_count(engine)
-    log.info("Current rows in table: %d", current_count)
+        current_count = get_row_count(conn)
+        log.info("Current rows in table: %d", current_count)
+
+        deleted = delete_all_rows(conn, dry_run=dry_run)
+        log.info("Deleted %d rows", deleted)
 
-    deleted = delete_all_rows(engine, dry_run=args.dry_run)
-    log.info("Deleted %d rows", deleted)
+        inserted = insert_events(conn, events, dry_run=dry_run)
+        log.info("Inserted %d rows", inserted)
 
-    inserted = insert_events(engine, events, dry_run=args.dry_run)
-    log.info("Inserted %d rows", inserted)
+        if not dry_run:
+            final_count = get_row_count(conn)
 
-    if args.dry_run:
+    if dry_run:
         log.info("=" * 60)
         log.info("DRY RUN COMPLETE - No changes were made")
         log.info("Run without --dry-run to perform actual upload")
         log.info("=" * 60)
     else:
-        final_count = get_row_count(engine)
         log.info("Stage 3 COMPLETE - Table now has %d rows", final_count)
 
     # Export data files (always, even in dry-run mode)
@@ -320,5 +347,22 @@ def main():
     log.info("Output files saved to: %s", OUTPUT_DIR)
 
 
+def _cli():
+    """Parse command-line arguments and run Stage 3."""
+    parser = argparse.ArgumentParser(description="Upload calendar events to PostgreSQL")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Test mode: validate and connect but don't modify database",
+    )
+    args = parser.parse_args()
+    main(dry_run=args.dry_run)
+
+
 if __name__ == "__main__":
-    main()
+    # Configure logging only when run as a script; src/main.py configures it
+    # once for the combined pipeline.
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
+    )
+    _cli()
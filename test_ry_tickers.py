@@ -4,24 +4,24 @@ Temporary diagnostic script to check what FactSet returns for Canadian bank
 US vs CA ticker variants. Shows event counts for all 7 Canadian banks.
 """
 
-import calendar
-import os
-import time
+import logging
+import sys
 from collections import defaultdict
-from datetime import datetime, date
 from pathlib import Path
-from urllib.parse import quote
 
 from dotenv import load_dotenv
-from dateutil.parser import parse as dateutil_parse
 
 import fds.sdk.EventsandTranscripts
 from fds.sdk.EventsandTranscripts.api import calendar_events_api
-from fds.sdk.EventsandTranscripts.models import (
-    CompanyEventRequest,
-    CompanyEventRequestData,
-    CompanyEventRequestDataDateTime,
-    CompanyEventRequestDataUniverse,
+
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+# Reuse Stage 1's client setup, date chunking and querying instead of a copy
+from stage_1_data_acquisition.data_acquisition import (  # noqa: E402
+    create_api_client,
+    fetch_events,
+    get_date_range,
 )
 
 try:
@@ -30,9 +30,6 @@ try:
 except ImportError:
     RBC_SECURITY_AVAILABLE = False
 
-PROJECT_ROOT = Path(__file__).parent
-load_dotenv(PROJECT_ROOT / ".env")
-
 # All 7 Canadian banks - CA tickers
 CANADIAN_BANKS_CA = [
     "RY-CA",   # Royal Bank of Canada
@@ -56,137 +53,14 @@ CANADIAN_BANKS_US = [
 
 TEST_TICKERS = CANADIAN_BANKS_CA + CANADIAN_BANKS_US
 
-PAST_MONTHS = 6
-FUTURE_MONTHS = 6
-
-
-def build_proxy_url():
-    proxy_user = os.getenv("PROXY_USER")
-    proxy_password = os.getenv("PROXY_PASSWORD")
-    proxy_url_base = os.getenv("PROXY_URL")
-
-    if not all([proxy_user, proxy_password, proxy_url_base]):
-        return None
-
-    proxy_domain = os.getenv("PROXY_DOMAIN", "MAPLE")
-    escaped_domain = quote(proxy_domain + "\\" + proxy_user)
-    escaped_password = quote(proxy_password)
-    return f"http://{escaped_domain}:{escaped_password}@{proxy_url_base}"
-
-
-def create_api_client():
-    proxy_url = build_proxy_url()
-
-    if proxy_url:
-        print("Proxy configured")
-        config = fds.sdk.EventsandTranscripts.Configuration(
-            username=os.getenv("FACTSET_USERNAME"),
-            password=os.getenv("FACTSET_PASSWORD"),
-            proxy=proxy_url,
-        )
-    else:
-        print("No proxy configured (direct connection)")
-        config = fds.sdk.EventsandTranscripts.Configuration(
-            username=os.getenv("FACTSET_USERNAME"),
-            password=os.getenv("FACTSET_PASSWORD"),
-        )
-
-    config.get_basic_auth_token()
-    return config
-
-
-def add_months(d, months):
-    month = d.month + months
-    year = d.year + (month - 1) // 12
-    month = ((month - 1) % 12) + 1
-    day = min(d.day, calendar.monthrange(year, month)[1])
-    return date(year, month, day)
-
-
-def get_date_range():
-    today = datetime.now().date()
-    start = add_months(today, -PAST_MONTHS).replace(day=1)
-    end_month = add_months(today, FUTURE_MONTHS)
-    end = date(end_month.year, end_month.month, calendar.monthrange(end_month.year, end_month.month)[1])
-    return (start, end)
-
-
-def split_date_range(start_date, end_date):
-    """Split date range into monthly chunks (first to last day of each month)."""
-    ranges = []
-    current = start_date
-
-    while current <= end_date:
-        last_day = calendar.monthrange(current.year, current.month)[1]
-        month_end = date(current.year, current.month, last_day)
-        chunk_end = min(month_end, end_date)
-        ranges.append((current, chunk_end))
-
-        if current.month == 12:
-            current = date(current.year + 1, 1, 1)
-        else:
-            current = date(current.year, current.month + 1, 1)
-
-    return ranges
-
-
-def query_chunk(api, tickers, start, end, max_retries=5):
-    """Query API for a single date range chunk with retry logic."""
-    request = CompanyEventRequest(
-        data=CompanyEventRequestData(
-            date_time=CompanyEventRequestDataDateTime(
-                start=dateutil_parse(f"{start}T00:00:00Z"),
-                end=dateutil_parse(f"{end}T23:59:59Z"),
-            ),
-            universe=CompanyEventRequestDataUniverse(symbols=tickers, type="Tickers"),
-        ),
-    )
-
-    for attempt in range(max_retries):
-        try:
-            response = api.get_company_event(request)
-            if response and hasattr(response, "data") and response.data:
-                return [e.to_dict() for e in response.data if e.ticker in tickers]
-            return []
-        except Exception as err:
-            error_msg = str(err)
-            is_last_attempt = attempt == max_retries - 1
-
-            is_retryable = any(x in error_msg.lower() for x in [
-                "parameter", "timeout", "connection", "temporary", "503", "429"
-            ])
-
-            if is_retryable and not is_last_attempt:
-                wait_time = 2 ** attempt
-                print(f"  API error (attempt {attempt + 1}/{max_retries}), retrying in {wait_time}s: {error_msg[:100]}")
-                time.sleep(wait_time)
-            else:
-                print(f"  API error (attempt {attempt + 1}/{max_retries}): {err}")
-                return []
-
-    return []
-
-
-def fetch_events(api, tickers, start_date, end_date):
-    """Fetch all events across date range chunks."""
-    chunks = split_date_range(start_date, end_date)
-    print(f"Querying {len(tickers)} tickers across {len(chunks)} monthly chunks")
-
-    events = []
-    for i, (start, end) in enumerate(chunks, 1):
-        print(f"  Chunk {i}/{len(chunks)}: {start} to {end}")
-        events.extend(query_chunk(api, tickers, start, end))
-        if i < len(chunks):
-            time.sleep(1)  # Delay between chunks
-
-    return events
-
 
 def main():
     print("=" * 70)
     print("Canadian Banks: CA vs US Ticker Diagnostic")
     print("=" * 70)
 
+    load_dotenv(PROJECT_ROOT / ".env")
+
     if RBC_SECURITY_AVAILABLE:
         rbc_security.enable_certs()
         print("RBC SSL certificates enabled")
@@ -199,7 +73,11 @@ def main():
 
     with fds.sdk.EventsandTranscripts.ApiClient(api_config) as client:
         api = calendar_events_api.CalendarEventsApi(client)
-        events = fetch_events(api, TEST_TICKERS, start_date, end_date)
+        events = [
+            event
+            for chunk in fetch_events(api, TEST_TICKERS, start_date, end_date)
+            for event in chunk
+        ]
 
     print(f"Total events returned: {len(events)}")
 
@@ -259,4 +137,7 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s"
+    )
     main()